@@ -82,14 +82,28 @@ class TokenAuthentication(AbstractAuthentication):
     request
     """
 
+    def __init__(self, config: Any):
+        AbstractAuthentication.__init__(self, config)
+        # The token does not change for the lifetime of a config, so the authorization header is only assembled once
+        # here instead of for every single request. Note that the "_headers" dict is shared between all the requests
+        # made with this object and must not be modified.
+        # Surrounding whitespace is removed from the token, because some http clients reject header values ending
+        # with a whitespace.
+        self._headers = self.authentication_headers(self.config.get_token().strip())
+        self._auth_value = self._headers['Authorization']
+
     # IMPLEMENT "AbstractAuthentication"
     # ----------------------------------
 
     def update_request_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
-        token = self.config.get_token()
-        headers = self.authentication_headers(token)
+        # If the request already defines its own headers, we only add the authorization to them. Otherwise the cached
+        # headers dict can be used directly.
+        headers = kwargs.get('headers')
+        if headers is None:
+            kwargs['headers'] = self._headers
+        else:
+            headers['Authorization'] = self._auth_value
 
-        kwargs.update({'headers': headers})
         return kwargs
 
     # HELPER METHODS
@@ -105,5 +119,5 @@ class TokenAuthentication(AbstractAuthentication):
         :return:
         """
         return {
-            'Authorization': 'TOKEN {}'.format(token)
+            'Authorization': 'TOKEN ' + token
         }
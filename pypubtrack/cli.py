@@ -3,16 +3,9 @@ import sys
 import os
 import click
 import shutil
-import datetime
-
-import pybliometrics
-from pybliometrics.scopus import AbstractRetrieval, ScopusSearch
-from pybliometrics.scopus import config as scopus_config
-
-from pykitopen import KitOpen
-from pykitopen.search import YearBatching
-from pykitopen.publication import Publication
-from pykitopen.config import DEFAULT
+import functools
+import operator
+from concurrent.futures import ThreadPoolExecutor
 
 from pypubtrack.util import (out,
                              get_config_path,
@@ -26,6 +19,84 @@ from pypubtrack.util import (out,
 from pypubtrack.config import Config
 from pypubtrack.pypubtrack import Pubtrack
 
+# The "pybliometrics" and "pykitopen" packages are only imported within the commands, which actually need them. Both
+# are rather expensive to import and would otherwise slow down every other command such as "--version" or "init".
+
+# The page size, which is used to fetch the list of all publications from pubtrack for the "update-kitopen" command.
+PREFETCH_PAGE_SIZE = 1000
+
+# Whether the pybliometrics config has already been set up during the lifetime of this process.
+_scopus_configured = False
+
+
+def setup_scopus(api_key: str):
+    """
+    Makes sure that a pybliometrics config file exists and sets the scopus *api_key* to be used. The config file is
+    only created with the first call within a process.
+
+    :param api_key: The scopus API key to be used for all following requests
+    :return:
+    """
+    global _scopus_configured
+    import pybliometrics
+    from pybliometrics.scopus import config as scopus_config
+
+    if not _scopus_configured:
+        try:
+            pybliometrics.scopus.utils.create_config()
+        except FileExistsError:
+            pass
+        _scopus_configured = True
+
+    scopus_config['Authentication']['APIKey'] = api_key
+
+
+def retrieve_abstract(doi: str):
+    """
+    Returns the scopus "AbstractRetrieval" for the publication with the given *doi*.
+
+    :param doi: The DOI of the publication
+    :return:
+    """
+    from pybliometrics.scopus import AbstractRetrieval
+    return AbstractRetrieval(doi)
+
+
+def try_retrieve_abstract(doi: str):
+    """
+    Returns the scopus "AbstractRetrieval" for the publication with the given *doi* or None, if it could not be
+    retrieved.
+
+    :param doi: The DOI of the publication
+    :return:
+    """
+    try:
+        return retrieve_abstract(doi)
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def get_kitopen_config() -> dict:
+    """
+    Returns the config dict for the KITOpen wrapper, which is used by the "update-kitopen" command. The dict is only
+    assembled once. It is not modified by the KITOpen wrapper and thus can be shared.
+
+    :return:
+    """
+    from pykitopen.search import YearBatching
+    from pykitopen.publication import Publication
+    from pykitopen.config import DEFAULT
+
+    # The "view" within the kitopen config defines how many details about a single publication record are supposed to
+    # be returned as a result of the query. the batching strategy defines in what kind of batches the data is supposed
+    # to be returned by the database. YearBatching is generally recommended to not hit the size limit.
+    return {
+        **DEFAULT,
+        'default_view':         Publication.VIEWS.FULL,
+        'batching_strategy':    YearBatching
+    }
+
 
 @click.group('pypubtrack', invoke_without_command=True)
 @click.option('--version', '-v', is_flag=True, help='Print the currently installed version of the program')
@@ -78,18 +149,21 @@ def init(ctx, force):
     uses of CLI commands.
     """
     folder_path = get_installation_path()
+    existing_dir = os.path.isdir(folder_path)
     # If "force" flag is true, then the user wants to delete the already existing installation first.
     if force:
-        if os.path.exists(folder_path) and os.path.isdir(folder_path):
+        if existing_dir:
             # "rmtree" is necessary here to delete a whole folder structure with all it's contents recursively
             shutil.rmtree(folder_path)
+            check_installation.cache_clear()
+            existing_dir = False
             click.secho('Deleted previous installation folder', fg='green')
         else:
             click.secho('No previous installation folder existed.')
 
     # We are being nice here and check for a potential error. If the installation folder already exists we will warn
     # the user and print a hint message
-    if os.path.exists(folder_path) and os.path.isdir(folder_path):
+    if existing_dir:
         click.secho('An installation folder already exists for this user!', fg='red')
         click.secho('HINT: run the "init" command with the "--force" flag to delete the previous one first')
         return 1
@@ -123,17 +197,14 @@ def import_scopus(ctx, verbose, start):
     It uses the scopus author ID's of these authors to send requests to the scopus database. The publications of these
     replies are then evaluated and posted into the pubtrack app.
     """
+    from pybliometrics.scopus import ScopusSearch
+
     # SETTING UP PUBTRACK WRAPPER
     config = ctx.obj['config']
     pubtrack = Pubtrack(config)
 
     # SETTING UP SCOPUS WRAPPER
-    try:
-        pybliometrics.scopus.utils.create_config()
-    except FileExistsError:
-        pass
-    finally:
-        scopus_config['Authentication']['APIKey'] = config.get_scopus_key()
+    setup_scopus(config.get_scopus_key())
 
     # FETCHING META AUTHOR INFORMATION FROM PUBTRACK
     click.secho('Fetching author information from pubtrack.')
@@ -152,61 +223,85 @@ def import_scopus(ctx, verbose, start):
 
     # QUERY SCOPUS DATABASE
     click.secho('Querying scopus database for the publications of those authors.')
-    date_limit = datetime.datetime(year=start, month=1, day=1)
-    for author_id, author_name in author_id_name_map.items():
-        publication_count = 0
-        search = ScopusSearch(f'AU-ID ( {author_id} )')
-        out(verbose, ' | Query "AU-ID ( {} )"'.format(author_id))
-
-        for result in search.results:
-
-            # We'll only take publications, which have a DOI
-            if result.doi is None:
+    # The cover dates of scopus publications are strings in the "YYYY-MM-DD" format. For this format the lexicographic
+    # order of the strings is the same as the chronological order, so they can be compared without parsing them.
+    date_limit = '{:04d}-01-01'.format(start)
+    # Publications, which are co-authored by multiple of the authors, will show up within the search results of each
+    # of them. Those are only processed for the first author.
+    seen_dois = set()
+    # These values are needed to filter the authors of every single publication, so they are only computed once here
+    known_ids = frozenset(author_id_name_map)
+    author_limit = config.get_author_limit()
+    # The abstract retrievals are network bound, which is why they are requested concurrently from a thread pool. The
+    # amount of threads is configurable to be able to respect the rate limits of the scopus API.
+    with ThreadPoolExecutor(max_workers=config.get_scopus_concurrency()) as executor:
+        for author_id, author_name in author_id_name_map.items():
+            # Authors, for which no scopus id is known, would only waste a request to the rate limited scopus API
+            if not author_id:
+                out(verbose, f' | Skipping author "{author_name}" without scopus id', fg='yellow')
                 continue
 
-            # requesting the detailed information from the scopus database for the current publication from the search
-            # results
-            try:
-                abstract_retrieval = AbstractRetrieval(result.doi)
-            except Exception as e:
-                out(verbose, '   # Could not retrieve publication "{}"'.format(result.doi), fg='yellow')
-                continue
+            publication_count = 0
+            search = ScopusSearch(f'AU-ID ( {author_id} )')
+            out(verbose, f' | Query "AU-ID ( {author_id} )"')
 
-            # If the publication is older than the date limit, it will be discarded
-            publication_date = datetime.datetime.strptime(abstract_retrieval.coverDate, '%Y-%m-%d')
-            if publication_date <= date_limit:
-                out(verbose, '   # Publication too old "{}"({})'.format(result.doi, publication_date), fg='yellow')
+            # "results" is None, if the search did not return any publications
+            results = search.results or ()
+            if not results:
+                out(verbose, f' | No results for author {author_id}', fg='yellow')
                 continue
-            else:
-                out(verbose, '   > Fetched publication "{}"'.format(result.doi))
 
-            adapter = ScopusPublicationAdapter(abstract_retrieval)
-            publication = adapter.get_publication()
+            # We'll only take publications, which have a DOI
+            dois = []
+            for result in results:
+                if result.doi is None or result.doi in seen_dois:
+                    continue
+                seen_dois.add(result.doi)
+                dois.append(result.doi)
+
+            # requesting the detailed information from the scopus database for the publications from the search
+            # results. "executor.map" returns the results in the same order as the DOIs.
+            abstract_retrievals = executor.map(try_retrieve_abstract, dois)
+            for doi, abstract_retrieval in zip(dois, abstract_retrievals):
+                if abstract_retrieval is None:
+                    out(verbose, f'   # Could not retrieve publication "{doi}"', fg='yellow')
+                    continue
+
+                # If the publication is older than the date limit, it will be discarded
+                publication_date = abstract_retrieval.coverDate
+                if publication_date is None or publication_date <= date_limit:
+                    out(verbose, f'   # Publication too old "{doi}"({publication_date})', fg='yellow')
+                    continue
+                else:
+                    out(verbose, f'   > Fetched publication "{doi}"')
 
-            # Filtering the authors according to the AUTHOR_LIMIT, which has been set.
-            # We cannot just use the first few authors however, we need to make sure that the author, from which we have
-            # this publication in the first place is in there. The rest just gets filled up...
-            authors = []
-            for author in publication['authors']:
-                if author['scopus_id'] in author_id_name_map.keys() or len(authors) < config.get_author_limit():
-                    authors.append(author)
+                adapter = ScopusPublicationAdapter(abstract_retrieval)
+                publication = adapter.get_publication()
 
-            publication['authors'] = authors
+                # Filtering the authors according to the AUTHOR_LIMIT, which has been set.
+                # We cannot just use the first few authors however, we need to make sure that the author, from which
+                # we have this publication in the first place is in there. The rest just gets filled up...
+                authors = []
+                for author in publication['authors']:
+                    if author['scopus_id'] in known_ids or len(authors) < author_limit:
+                        authors.append(author)
 
-            # Now we try to actually POST the publication to the pubtrack REST API
-            try:
-                pubtrack.import_publication(publication)
-                publication_count += 1
-                out(verbose, '   * Added to pubtrack: "{}"'.format(publication['title']), fg='green')
-            except Exception as e:
-                if str(e) == 'uuid':
-                    out(verbose, '   ! Error while posting to pubtrack: Already exists!', fg='red')
-                else:
-                    out(verbose, '   ! Error while posting to pubtrack: {}'.format(str(e)), fg='red')
-                continue
+                publication['authors'] = authors
+
+                # Now we try to actually POST the publication to the pubtrack REST API
+                try:
+                    pubtrack.import_publication(publication)
+                    publication_count += 1
+                    out(verbose, f'   * Added to pubtrack: "{publication["title"]}"', fg='green')
+                except Exception as e:
+                    if str(e) == 'uuid':
+                        out(verbose, '   ! Error while posting to pubtrack: Already exists!', fg='red')
+                    else:
+                        out(verbose, f'   ! Error while posting to pubtrack: {e}', fg='red')
+                    continue
 
-        out(True, ' --> Total of {} publications imported from author {}'.format(publication_count, author_id),
-            fg='green', bold=True)
+            out(True, f' --> Total of {publication_count} publications imported from author {author_id}',
+                fg='green', bold=True)
 
 
 @click.command('update-kitopen', short_help='Updates existing pubtrack publication records with KITOpen information')
@@ -221,78 +316,102 @@ def update_kitopen(ctx, verbose, start):
     query the KITOpen database. The data from KITOpen will then finally be used to update the publication records +
     of the pubtrack application.
     """
+    from pykitopen import KitOpen
+
     config = ctx.obj['config']
     pubtrack = Pubtrack(config)
 
     # Getting the meta authors from the pubtrack site
     click.secho('Fetching author information from pubtrack.')
-    author_names = []
+    # A set is used, because the same author may be part of multiple meta authors. Duplicate names would only inflate
+    # the KITOpen query.
+    author_names = set()
     meta_authors = pubtrack.meta_author.get()['results']
     for meta_author in meta_authors:
         for author in meta_author['authors']:
             # "author_name_kitopen" returns a string with the authors name. This function essentially formats the name
             # in a way so that it can be used in a query string for the KITOpen database.
             name = author_name_kitopen(author['first_name'], author['last_name'])
-            author_names.append(name)
-            out(verbose, ' > Adding author "{}" to query'.format(name))
+            if name not in author_names:
+                author_names.add(name)
+                out(verbose, ' > Adding author "{}" to query'.format(name))
 
     click.secho('==> Processing total of {} authors'.format(len(author_names)))
 
     # Setting up KITOpen API.
-    # The "view" within the kitopen config defines how many details about a single publication record are supposed to
-    # be returned as a result of the query. the batching strategy defines in what kind of batches the data is supposed
-    # to be returned by the database. YearBatching is generally recommended to not hit the size limit.
-    kitopen_config = DEFAULT.copy()
-    kitopen_config['default_view'] = Publication.VIEWS.FULL
-    kitopen_config['batching_strategy'] = YearBatching
-
-    kitopen = KitOpen(kitopen_config)
+    kitopen = KitOpen(get_kitopen_config())
 
     # Using the names of these authors to query kitopen results.
     # The "author" field of the search request is supposed to be the main query string. It will combine the names of
-    # all the previously fetched authors with "or" directives between them.
+    # all the previously fetched authors with "or" directives between them. The names are sorted, so that the same
+    # set of authors always results in the same query string.
     click.secho('Querying KITOpen database with previously fetched authors.')
     results = kitopen.search({
-        'author': ' or '.join(author_names),
+        'author': ' or '.join(sorted(author_names)),
         'start': start,
         'end': ''
     })
 
+    # Instead of requesting every single publication from pubtrack by its DOI, all the publication records are fetched
+    # once up front and then indexed by their DOI. The DOI is the only way to associate a KITOpen record with a record
+    # of the pubtrack application.
+    click.secho('Fetching publication records from pubtrack.')
+    # The pages are requested one after another, so a large page size keeps the amount of requests small.
+    params = {pubtrack.publication.page_size_param: PREFETCH_PAGE_SIZE}
+    publications_by_doi = {pub['doi']: pub for pub in pubtrack.publication.iter(params) if pub['doi']}
+
     # Processing the kitopen results to update the pubtrack entries with that
     click.secho('Updating pubtrack records with KITOpen data')
     count_total = 0
     count_success = 0
-    for publication in results:
-        # The "publication" results of a KITOpen request save all their content in the internal "data" dict property.
-        # Here we only consider publications, which have a valid DOI as that is the only way we can properly identify
-        # them and associate them with the correct entries of the pubtrack application.
-        if publication.data['doi']:
-            try:
-                # This is what I meant. The "get_by" function attempts to fetch a publication record from the pubtrack
-                # app, which is uniquely identified by the doi from the KITOpen record.
-                pub = pubtrack.publication.get_by(doi=publication.data['doi'])
+    # The fields of the KITOpen records, which are used to update the pubtrack records
+    get_kitopen_fields = operator.itemgetter('pof_structure', 'id')
+    # The PATCH requests are submitted to a thread pool, so that the network latency of these requests overlaps with
+    # each other and with the remaining KITOpen batches, which are only requested while iterating the results.
+    with ThreadPoolExecutor(max_workers=config.get_concurrency()) as executor:
+        futures = []
+        # "results" is not a list but lazily requests the KITOpen batches one after another while being iterated.
+        for publication in results:
+            # The "publication" results of a KITOpen request save all their content in the internal "data" dict
+            # property. Here we only consider publications, which have a valid DOI. All others are skipped right away.
+            data = publication.data
+            doi = data['doi']
+            if not doi:
+                continue
+
+            count_total += 1
+            pub = publications_by_doi.get(doi)
+            if pub is None:
+                out(verbose, f' # Warning updating publication {doi}', fg='yellow')
+                continue
 
-                # Now we need to update this record of pubtrack. For that we are going to use a http PATCH request.
-                # This way we only need to assemble a dict with the actually new data.
-                # The important data from KITOpen are the ID and the POF structure
+            # Now we need to update this record of pubtrack. For that we are going to use a http PATCH request.
+            # This way we only need to assemble a dict with the actually new data.
+            # The important data from KITOpen are the ID and the POF structure
+            # A malformed record must only skip this publication and not abort the whole update.
+            try:
+                pof_structure, kitopen_id = get_kitopen_fields(data)
                 patch = {
                     'on_kitopen': True,
-                    'pof_structure': publication.data['pof_structure']
+                    'pof_structure': pof_structure
                 }
                 if not pub['kitopen_id']:
-                    patch['kitopen_id'] = publication.data['id']
+                    patch['kitopen_id'] = kitopen_id
+
+                # The patch request is identified with the UUID of the publication. The uuid is the main identifier
+                # for the pubtrack app and is different from the DOI.
+                future = executor.submit(pubtrack.publication.patch, pub['uuid'], patch=patch)
+                futures.append((doi, future))
+            except Exception:
+                out(verbose, f' # Warning updating publication {doi}', fg='yellow')
 
-                # The patch request is identified with the UUID of the publication! This is why we had to get it before
-                # in the first place. The uuid is the main identifier for the pubtrack app and is different from the
-                # DOI.
-                pubtrack.publication.patch(pub['uuid'], patch=patch)
+        for doi, future in futures:
+            try:
+                future.result()
                 count_success += 1
-                out(verbose, ' > updated publication {}'.format(publication.data['doi']))
+                out(verbose, f' > updated publication {doi}')
             except Exception as e:
-                out(verbose, ' # Warning updating publication {}'.format(publication.data['doi']),
-                    fg='yellow')
-            finally:
-                count_total += 1
+                out(verbose, f' # Warning updating publication {doi}', fg='yellow')
 
     out(True, '==> Updated {}/{} publications with KITOpen data'.format(count_success, count_total),
         fg='green', bold=True)
@@ -316,12 +435,14 @@ def list_publications(ctx, verbose, uuid, doi):
     elif doi:
         publications = [pubtrack.publication.get_by(doi=doi)]
     else:
-        publications = pubtrack.publication.get()['results']
+        # The pages of the list are requested one after the other while they are displayed. This way the output
+        # starts with the first page and not all the publications have to be kept in memory.
+        publications = pubtrack.publication.iter()
 
     # DISPLAYING PUBLICATIONS TO THE USER
+    template = get_template('publication.j2') if verbose else None
     for publication in publications:
         if verbose:
-            template = get_template('publication.j2')
             info = template.render(publication=publication)
             out(verbose, info)
         else:
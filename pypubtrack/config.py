@@ -1,11 +1,21 @@
 import os
+import copy
+import time
 import toml
 from pathlib import Path
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 import pypubtrack.authentication as authentication
 
 PATH = Path(__file__).parent.absolute()
 
+# This dict caches the parsed content of config files. The keys are tuples of the absolute file path, the modification
+# time and the size of the file, so that a changed file will be parsed again.
+_PARSED_CACHE = {}
+
 # CONFIG CLASS
 # ============
 
@@ -20,7 +30,7 @@ class Singleton(type):
         return cls._instances[cls]
 
 
-class Config(metaclass=Singleton):
+class Config(dict, metaclass=Singleton):
     """
     This is a singleton class, which implements the access to the config file.
 
@@ -44,62 +54,200 @@ class Config(metaclass=Singleton):
     structure of the config file you would have to change every occasion in the code, which uses this attribute...
     This is obviously a bad SOC. With a class you could write methods, which wrap certain behaviour. After a change
     only this method would have to be changed.
+
+    **Dict Subclass**
+
+    The config object itself is a dict subclass, which contains the config data. This way all the item access methods
+    are the (fast) native dict methods.
     """
 
     def __init__(self):
+        dict.__init__(self)
         config_template_path = os.path.join(PATH, 'templates', 'config.toml')
-        self.data = {}
+        self.session = None
+        self._clear_cache()
         self.load_file(config_template_path)
 
     # IMPLEMENTING DICT FUNCTIONALITY
     # -------------------------------
-
-    def __getitem__(self, item):
-        return self.data[item]
+    # All the other dict methods are inherited unchanged.
 
     def __setitem__(self, key, value):
-        self.data[key] = value
+        dict.__setitem__(self, key, value)
+        self._clear_cache()
 
-    def __contains__(self, item):
-        return item in self.data.keys()
-
-    def keys(self):
-        return self.data.keys()
-
-    def values(self):
-        return self.data.values()
-
-    def items(self):
-        return self.data.items()
+    @property
+    def data(self) -> dict:
+        # Previously the config data was stored in a separate "data" dict. This property is kept for compatibility.
+        return self
 
     # WRAPPER METHODS
     # ---------------
 
+    # The results of the following methods are cached, because they are needed for every single request to the
+    # pubtrack app. The cache is cleared when new config data is loaded or a top level section is assigned.
+
     def get_url(self) -> str:
-        return self.data['basic']['url']
+        if self._url is None:
+            self._url = self['basic']['url']
+
+        return self._url
 
     def get_token(self) -> str:
-        return self.data['auth']['token']
+        if self._token is None:
+            self._token = self['auth']['token']
+
+        return self._token
 
     def get_authentication_class(self) -> type:
-        class_string = self.data['auth']['type']
-        return getattr(authentication, class_string)
+        if self._auth_cls is None:
+            class_string = self['auth']['type']
+            self._auth_cls = getattr(authentication, class_string)
+
+        return self._auth_cls
+
+    def get_authenticator(self) -> authentication.AbstractAuthentication:
+        # All requests share the same authentication object, which is created from the authentication class given by
+        # the config.
+        if self._authenticator is None:
+            authentication_class = self.get_authentication_class()
+            self._authenticator = authentication_class(self)
+
+        return self._authenticator
+
+    def get_concurrency(self) -> int:
+        return self['basic'].get('concurrency', 8)
+
+    def get_cache_ttl(self) -> float:
+        return self['basic'].get('cache_ttl', 0)
 
     def get_author_limit(self) -> int:
-        return self.data['scopus']['author_limit']
+        return self['scopus']['author_limit']
 
     def get_scopus_key(self) -> str:
-        return self.data['scopus']['api_key']
+        return self['scopus']['api_key']
+
+    def get_scopus_concurrency(self) -> int:
+        return self['scopus'].get('concurrency', 8)
+
+    def get_http_backend(self) -> str:
+        return self['basic'].get('http_backend', 'requests')
+
+    def get_session(self) -> requests.Session:
+        """
+        Returns the http session, which is used for all the requests to the pubtrack app.
+
+        The session is only created with the first call. Reusing the same session keeps the connections to the server
+        alive, so that not every single request has to establish a new TCP and TLS connection. Idempotent requests,
+        which fail due to rate limiting or a temporarily unavailable server are retried automatically.
+
+        If the "http_backend" option of the config is set to "httpx", a HttpxSession is returned instead, which
+        supports HTTP/2.
+
+        :return:
+        """
+        if self.session is None:
+            if self.get_http_backend() == 'httpx':
+                self.session = HttpxSession()
+            else:
+                retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504])
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+
+                self.session = requests.Session()
+                self.session.mount('http://', adapter)
+                self.session.mount('https://', adapter)
+
+        return self.session
 
     # HELPER FUNCTIONS
     # ----------------
 
     def load_dict(self, data: dict):
-        self.data = data
+        if data is not self:
+            self.clear()
+            self.update(data)
+
+        self._clear_cache()
         return self
 
     def load_file(self, file_path: str):
-        data = toml.load(file_path)
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_mtime_ns, stat.st_size)
+        if key not in _PARSED_CACHE:
+            _PARSED_CACHE[key] = toml.load(file_path)
+
+        # The cached dict itself must not be handed out, because the config data can be modified afterwards.
+        data = copy.deepcopy(_PARSED_CACHE[key])
         return self.load_dict(data)
 
+    def _clear_cache(self):
+        self._url = None
+        self._token = None
+        self._auth_cls = None
+        self._authenticator = None
+        # The new config data could define a different http backend, so the session is created again with the next
+        # request. Closing the old session releases its pooled connections.
+        if self.session is not None:
+            self.session.close()
+            self.session = None
 
+
+# HTTP BACKENDS
+# =============
+
+
+class HttpxSession:
+    """
+    This class wraps a "httpx.Client", so that it can be used in place of a "requests.Session".
+
+    With HTTP/2 all the concurrent requests to the pubtrack app are multiplexed over a single connection. The "httpx"
+    library is an optional dependency, it is only imported once this class is actually used. HTTP/2 additionally
+    requires the "h2" package, which can be installed with "pip install httpx[http2]".
+
+    The behaviour matches the session of the "requests" backend: Failed connections are retried by the transport and
+    idempotent requests are retried for the same status codes and with the same backoff.
+
+    :param transport: An optional httpx transport to be used instead of the default HTTP/2 transport.
+    """
+    # These are the same settings, which are used for the "Retry" policy of the requests backend.
+    RETRIES = 3
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUS_CODES = frozenset([429, 502, 503, 504])
+    RETRY_METHODS = frozenset(['get', 'head', 'put', 'delete', 'options', 'trace'])
+
+    def __init__(self, transport=None):
+        import httpx
+
+        if transport is None:
+            transport = httpx.HTTPTransport(
+                http2=True,
+                retries=self.RETRIES,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+
+        self.client = httpx.Client(transport=transport, timeout=httpx.Timeout(30.0))
+
+    def request(self, method: str, **kwargs):
+        # The endpoints pass the already serialized json body as "data". For httpx the raw bytes have to be passed
+        # as "content" instead.
+        if 'data' in kwargs:
+            kwargs['content'] = kwargs.pop('data')
+
+        # "requests" drops url parameters with the value None, while httpx would send them with an empty value.
+        params = kwargs.get('params')
+        if params:
+            kwargs['params'] = {key: value for key, value in params.items() if value is not None}
+
+        response = self.client.request(method, **kwargs)
+        if method.lower() in self.RETRY_METHODS:
+            for retry in range(self.RETRIES):
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    break
+                time.sleep(self.BACKOFF_FACTOR * (2 ** retry))
+                response = self.client.request(method, **kwargs)
+
+        return response
+
+    def close(self):
+        self.client.close()
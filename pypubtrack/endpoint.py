@@ -1,14 +1,35 @@
-import os
 import sys
 import copy
-import inspect
-import urllib.parse
-from typing import Dict, Any, Type, Union
-
-import requests
+import time
+import threading
+from typing import Dict, Any, Type, Union, Iterable, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 from pypubtrack.config import Config
 
+# "orjson" is an optional dependency. It is a lot faster than the standard library json module, which is especially
+# noticeable for large list responses. If it is not installed, the standard library is used instead.
+try:
+    import orjson
+
+    def dump_json(data: Any) -> bytes:
+        return orjson.dumps(data)
+
+    load_json = orjson.loads
+except ImportError:
+    import json
+
+    def dump_json(data: Any) -> bytes:
+        return json.dumps(data).encode('utf-8')
+
+    load_json = json.loads
+
+# This dict caches the responses of GET requests, if the "cache_ttl" option of the config is set. The keys are tuples
+# of the url and the sorted url parameters, the values are tuples of the time of the request and the parsed response.
+# The cache is used from the thread pools of the "..._many" methods, so all access has to hold the lock.
+_RESPONSE_CACHE = {}
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
 
 class Endpoint:
     """
@@ -36,8 +57,6 @@ class Endpoint:
 
     .. code-block:: python
 
-        import os
-
         class BooksEndpoint(Endpoint):
 
             def __init__(self, url, config):
@@ -77,8 +96,37 @@ class Endpoint:
         specific_citation = citation_endpoint.get('ultralearning', 'thinking-fast-thinking-slow')
 
     """
+    # Endpoint objects are created very frequently, for every access of an endpoint property and every chaining step.
+    # Using slots instead of an instance dict makes them smaller and faster to create. Subclasses should define an
+    # empty "__slots__" tuple as well to retain this benefit.
+    __slots__ = ('url', 'config')
+
+    # The name of the url parameter, which defines the amount of records per page of a list response
+    page_size_param = 'page_size'
+    # The max amount of concurrent requests, which are sent by the "..._many" methods. If this is None, the
+    # "concurrency" value of the config is used.
+    max_workers = None
+
+    # The relative path returned by "get_endpoint", which is computed once for every subclass
+    _endpoint_path = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # "get_endpoint" usually just returns a constant string. So instead of calling it for every new instance, it is
+        # only evaluated once when the subclass is defined. Implementations, which actually depend on the state of the
+        # instance will fail here. For those "get_endpoint" is still called for every new instance.
+        try:
+            cls._endpoint_path = cls.get_endpoint(cls).strip('/')
+        except Exception:
+            cls._endpoint_path = None
+
     def __init__(self, url: str, config: Config):
-        self.url = os.path.join(url, self.get_endpoint())
+        endpoint_path = self._endpoint_path
+        if endpoint_path is None:
+            endpoint_path = self.get_endpoint().strip('/')
+
+        # The url of the endpoint always ends with a slash. This way "_get_url" only has to append the primary keys.
+        self.url = url.rstrip('/') + '/' + endpoint_path + '/'
         self.config = config
 
     # BASIC API OPERATIONS
@@ -97,7 +145,7 @@ class Endpoint:
             'url':          self._get_url(*pk)
         })
 
-    def put(self, *pk, data: dict = {}):
+    def put(self, *pk, data: Optional[dict] = None):
         """
         Sends a PUT request for the given primary key *pk* and the *data* dict.
         A put request is used to modify an already existing record which is identified by the given primary key. This
@@ -109,12 +157,13 @@ class Endpoint:
         :param data:
         :return:
         """
-        return self._request('put', {
-            'url':          self._get_url(*pk),
-            'json':         data
-        })
+        kwargs = {'url': self._get_url(*pk)}
+        if data is not None:
+            kwargs['json'] = data
+
+        return self._request('put', kwargs)
 
-    def patch(self, *pk, patch: dict = {}):
+    def patch(self, *pk, patch: Optional[dict] = None):
         """
         Sends a PATCH request for the given primary key *pk* and the *patch* dict.
 
@@ -126,12 +175,13 @@ class Endpoint:
         :param patch:
         :return:
         """
-        return self._request('patch', {
-            'url':          self._get_url(*pk),
-            'json':         patch
-        })
+        kwargs = {'url': self._get_url(*pk)}
+        if patch is not None:
+            kwargs['json'] = patch
 
-    def post(self, data: dict = {}):
+        return self._request('patch', kwargs)
+
+    def post(self, data: Optional[dict] = None):
         """
         Sends a POST request for the given *data* dict.
         A post request is used to insert a new record. The data dict has to contain all the necessary information to
@@ -140,12 +190,13 @@ class Endpoint:
         :param data:
         :return:
         """
-        return self._request('post', {
-            'url':          self._get_url(),
-            'json':         data
-        })
+        kwargs = {'url': self._get_url()}
+        if data is not None:
+            kwargs['json'] = data
 
-    def get(self, *pk, params: dict = {}):
+        return self._request('post', kwargs)
+
+    def get(self, *pk, params: Optional[dict] = None):
         """
         Sends a GET request for the given primary key *pk* and the additional get url parameters *params*.
         A get request is used to read the information of a specific record identified by the given primary key.
@@ -157,10 +208,34 @@ class Endpoint:
         :param params:
         :return:
         """
-        return self._request('get', {
-            'url':          self._get_url(*pk),
-            'params':       params
-        })
+        kwargs = {'url': self._get_url(*pk)}
+        if params is not None:
+            kwargs['params'] = params
+
+        # The response cache is optional. It is only used if a time to live is configured.
+        ttl = self.config.get_cache_ttl()
+        if not ttl:
+            return self._request('get', kwargs)
+
+        # Url parameters with list values are valid for requests, but can not be part of a dict key. Those requests
+        # are simply not cached.
+        key = (kwargs['url'], tuple(sorted(params.items())) if params else ())
+        try:
+            hash(key)
+        except TypeError:
+            return self._request('get', kwargs)
+
+        with _RESPONSE_CACHE_LOCK:
+            entry = _RESPONSE_CACHE.get(key)
+
+        # The request itself is sent without holding the lock, so that concurrent requests are not serialized.
+        if entry is None or time.monotonic() - entry[0] >= ttl:
+            entry = (time.monotonic(), self._request('get', kwargs))
+            with _RESPONSE_CACHE_LOCK:
+                _RESPONSE_CACHE[key] = entry
+
+        # The cached response itself must not be handed out, because it could be modified by the caller.
+        return copy.deepcopy(entry[1])
 
     # COMPOSITE API OPERATIONS
     # ------------------------
@@ -169,18 +244,34 @@ class Endpoint:
 
     def post_or_get(self, data: dict, **get):
         """
-        This method first attempts to post a new record with the given *data* dict. If this insert fails because a
-        record with the given unique keys already exists, it will instead fetch this data. In any case after executing
-        this method, one can be sure that a record with the given unique properties exists in the application and the
-        details are returned.
+        This method first attempts to fetch the record with the given unique properties *get*. Only if such a record
+        does not exist yet (or the unique properties are empty), a new record is posted with the given *data* dict.
+        In any case after executing this method, one can be sure that a record with the given unique properties
+        exists in the application and the details are returned.
 
         :param data:
         :param get:
         :return:
         """
+        # During an import most of the records usually exist already. Looking them up first is cheaper than a POST
+        # request, which is rejected by the server after validating the whole body. This is only safe if all the
+        # unique properties actually have a value though: Empty url parameters are ignored by the filters of the
+        # server, so the lookup would just return the first record of the whole list.
+        lookup = bool(get) and all(value is not None and value != '' for value in get.values())
+        if lookup:
+            try:
+                return self.get_by(**get)
+            except FileNotFoundError:
+                pass
+
         try:
             return self.post(data)
-        except ConnectionError:
+        except ConnectionError as error:
+            # The record could have been inserted by someone else in the meantime. The server rejects such a
+            # duplicate with a 400. All other errors are actual problems and are raised. Without usable unique
+            # properties, the existing record can not be identified, so the error is raised as well.
+            if not lookup or getattr(error, 'status_code', None) != 400:
+                raise
             return self.get_by(**get)
 
     def get_by(self, **params):
@@ -194,11 +285,78 @@ class Endpoint:
         :param params:
         :return:
         """
-        results = self.get('', params=params)['results']
+        # Only the first record is returned, so only a single record is requested in the first place. This saves the
+        # transfer and parsing of all the other matching records.
+        query = dict(params)
+        query.setdefault(self.page_size_param, 1)
+        results = self.get('', params=query)['results']
         if len(results) == 0:
             raise FileNotFoundError('{} not found {}'.format(str(self), str(params)))
         return results[0]
 
+    def get_many(self, pks: Iterable[Any], params: Optional[dict] = None) -> List[Any]:
+        """
+        Sends GET requests for all the given primary keys *pks* concurrently and returns the list of the results in the
+        same order. For records with multiple primary keys, the elements of *pks* have to be tuples.
+
+        Since the requests are bound by the network latency, sending them concurrently over the pooled connections of
+        the http session is a lot faster than sending them one after another.
+
+        :param pks:
+        :param params:
+        :return:
+        """
+        def get(pk):
+            return self.get(*pk, params=params) if isinstance(pk, tuple) else self.get(pk, params=params)
+
+        with ThreadPoolExecutor(max_workers=self._get_max_workers()) as executor:
+            return list(executor.map(get, pks))
+
+    def post_many(self, items: Iterable[dict]) -> List[Any]:
+        """
+        Sends POST requests for all the given data dicts *items* concurrently and returns the list of the responses in
+        the same order.
+
+        :param items:
+        :return:
+        """
+        with ThreadPoolExecutor(max_workers=self._get_max_workers()) as executor:
+            return list(executor.map(self.post, items))
+
+    def post_or_get_many(self, items: Iterable[Tuple[dict, dict]]) -> List[Any]:
+        """
+        Executes "post_or_get" concurrently for all the given *items* and returns the list of the results in the same
+        order. Each item has to be a tuple of the data dict and the dict of the unique properties for the get request.
+
+        :param items:
+        :return:
+        """
+        def post_or_get(item):
+            data, get = item
+            return self.post_or_get(data, **get)
+
+        with ThreadPoolExecutor(max_workers=self._get_max_workers()) as executor:
+            return list(executor.map(post_or_get, items))
+
+    def iter(self, params: Optional[dict] = None):
+        """
+        Returns a generator, which yields all the records of the endpoint, that match the given url *params*.
+
+        The list results of the pubtrack API are paginated. While "get" only returns the first page, this method
+        follows the "next" links of the responses and requests the following pages one at a time, as they are needed.
+
+        :param params:
+        :return:
+        """
+        response = self.get(params=params)
+        yield from response['results']
+        while response.get('next'):
+            # The "next" url already contains all the url parameters of the original request
+            response = self._request('get', {
+                'url':          response['next']
+            })
+            yield from response['results']
+
     # PROTECTED METHODS
     # -----------------
 
@@ -210,27 +368,58 @@ class Endpoint:
         :param kwargs:
         :return:
         """
+        # The json body of the request is serialized here instead of by the "requests" library, because "dump_json"
+        # uses the much faster "orjson" library, if it is installed. The content type header has to be set manually
+        # in this case.
+        if 'json' in kwargs:
+            kwargs['data'] = dump_json(kwargs.pop('json'))
+            kwargs['headers'] = {'Content-Type': 'application/json'}
+
+        # Any modification of records of this endpoint could make the cached responses for it invalid.
+        if method != 'get' and _RESPONSE_CACHE:
+            self._invalidate_cache()
+
         # "_authentication" method adds the necessary authentication details to the kwrags dict. Otherwise it leaves
         # the dict the same
         kwargs = self._authentication(kwargs)
 
-        # The "requests" module is a python library which implements the HTTP methods.
-        # Here we dynamically invoke different methods from this module based on the string name of the http method
-        # i.e. get, put, patch...
-        func = getattr(requests, method)
-        response = func(**kwargs)
-        #print(kwargs, response.content)
-        if response.status_code in [400, 403]:
-            raise ConnectionError('Request "{}" with status code: {} (kwargs: {})'.format(
+        # The session object of the "requests" library implements the HTTP methods. Using the session of the config
+        # for all requests reuses the connections to the server.
+        # The "request" method of the session accepts the string name of the http method i.e. get, put, patch...
+        response = self.config.get_session().request(method, **kwargs)
+        if response.status_code >= 400:
+            # All client and server errors are raised. Previously only 400 and 403 were treated as errors, which meant
+            # that for example the json error description of a 404 response was returned as if it was the record.
+            # The kwargs are attached to the exception instead of being formatted into the message. For POST requests
+            # they contain the whole request body, which would be costly to convert into a string.
+            error = ConnectionError('Request "{}" to "{}" with status code: {}'.format(
                 method,
-                response.status_code,
-                str(kwargs))
+                kwargs['url'],
+                response.status_code)
             )
+            error.kwargs = kwargs
+            error.status_code = response.status_code
+            raise error
         else:
             # The result of the API request will be a json description of the database records, which were requested
-            # "json" here is a convenience function, which returns a dict object, that was automatically json
-            # parsed from the string content of the reply.
-            return response.json()
+            # "load_json" returns the dict object, which is parsed from the binary content of the reply.
+            return load_json(response.content)
+
+    def _invalidate_cache(self):
+        """
+        Removes all the cached GET responses for urls of this endpoint.
+
+        :return:
+        """
+        with _RESPONSE_CACHE_LOCK:
+            for key in [key for key in _RESPONSE_CACHE if key[0].startswith(self.url)]:
+                del _RESPONSE_CACHE[key]
+
+    def _get_max_workers(self) -> int:
+        if self.max_workers is None:
+            return self.config.get_concurrency()
+
+        return self.max_workers
 
     def _get_url(self, *args):
         """
@@ -257,17 +446,16 @@ class Endpoint:
         """
         # Changed 12.10.2020
         # Previously I was using "os.path.join" in this case and it was working fine, but I realized that this would
-        # only be the case for linux os.
-        # relative_url pre-assembles the back part of the url and "urljoin" then creates the overall correct url.
-        relative_url = '/'.join(args) if args else ''
-        url = '/'.join([self.url, relative_url])
+        # only be the case for linux os. URLs are now only assembled with plain string operations, which are also a
+        # lot faster.
+        # The "url" attribute already ends with a slash, so only the primary keys have to be appended. The resulting
+        # url also has to end with a slash. It turns out, that this is actually important!
+        # Primary keys do not have to be strings, integer ids are converted here.
+        relative_url = '/'.join(map(str, args))
+        if not relative_url:
+            return self.url
 
-        # With this we make sure that the url actually ends with a slash. In case it does not, one is added.
-        # It turns out, that this is actually important!
-        if url[-1] != '/':
-            url += '/'
-
-        return url
+        return self.url + relative_url + '/'
 
     def _authentication(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -280,12 +468,10 @@ class Endpoint:
         :param kwargs:
         :return:
         """
-        # "get_authentication_class" returns the class object of a subclass of AbstractAuthentication. These
-        # subclasses fully implement all necessary steps for the authentication. The also implement a __call__ method
-        # which adds this to the kwargs dict.
-        authentication_class = self.config.get_authentication_class()
-        authenticate = authentication_class(self.config)
-        return authenticate(kwargs)
+        # "get_authenticator" returns an instance of a subclass of AbstractAuthentication. These subclasses fully
+        # implement all necessary steps for the authentication. The also implement a __call__ method which adds this
+        # to the kwargs dict. The same instance is shared by all the endpoints, which use the same config.
+        return self.config.get_authenticator()(kwargs)
 
     # MAGIC METHODS
     # -------------
@@ -296,9 +482,10 @@ class Endpoint:
 
         **Details**
 
-        This method creates a deep copy of the very object, which it is called from. Then it changes the base API URL
-        of the "url" attribute to include the primary keys which were passed as arguments to this method. This
-        new instance object is then returned. The purpose of this functionality is primarily for the possibility
+        This method creates a shallow copy of the very object, which it is called from. The copy shares the config
+        (and with it the http session) with the original. Then it changes the base API URL of the "url" attribute of
+        the copy to include the primary keys which were passed as arguments to this method. This new instance object
+        is then returned. The purpose of this functionality is primarily for the possibility
         of "endpoint chaining". For a detailed explanation see the class `AddEndpoint`
 
         **Example**
@@ -321,17 +508,55 @@ class Endpoint:
         :param pk:
         :return:
         """
-        this = copy.deepcopy(self)
+        # A shallow copy is sufficient here, because "url" is the only attribute, which is changed for the new
+        # instance. All other attributes are shared with the original object and must not be modified.
+        this = self.__copy__()
         this.url = self._get_url(*pk)
         return this
 
+    def __copy__(self):
+        """
+        Returns a shallow copy of the endpoint object, which shares the config with this object.
+
+        :return:
+        """
+        this = self.__class__.__new__(self.__class__)
+        # Subclasses can define slots of their own, so the slots of all the classes in the hierarchy are copied.
+        for cls in type(self).__mro__:
+            slots = cls.__dict__.get('__slots__', ())
+            for name in ((slots,) if isinstance(slots, str) else slots):
+                if name not in ('__dict__', '__weakref__') and hasattr(self, name):
+                    setattr(this, name, getattr(self, name))
+        # Subclasses, which do not define "__slots__" themselves, still have an instance dict
+        if hasattr(self, '__dict__'):
+            this.__dict__.update(self.__dict__)
+
+        return this
+
+    def __deepcopy__(self, memo: dict):
+        """
+        Returns a copy of the endpoint object.
+
+        Even a "deep" copy shares the config with this object. The config is a singleton anyways and copying it would
+        also copy the http session including its connection pool as well as the authentication object, which would be
+        very expensive.
+
+        :param memo:
+        :return:
+        """
+        this = self.__copy__()
+        if hasattr(self, '__dict__'):
+            this.__dict__ = copy.deepcopy(self.__dict__, memo)
+
+        return this
+
     def __str__(self):
         """
         Returns the string representation of a Endpoint object, which is simply a formatted version of the URL, which
         is returned by the "get_endpoint" method.
         :return:
         """
-        return "ENDPOINT {}".format(self.url)
+        return "ENDPOINT {}".format(self.url.rstrip('/'))
 
     # ABSTRACT METHODS
     # ----------------
@@ -350,6 +575,33 @@ class Endpoint:
         raise NotImplementedError()
 
 
+class CachedEndpoint:
+    """
+    This is a descriptor, which wraps the function *func* creating an endpoint for the decorated object.
+
+    It works like "functools.cached_property": The result of the first access is stored in the instance dict of the
+    object under the same name. Since this is a non-data descriptor, all subsequent accesses then directly return the
+    value from the instance dict.
+
+    Endpoint objects themselves are never used to store the value: Chaining copies an endpoint and changes the url of
+    the copy, which would make all the cached child endpoints of that copy point to the wrong url.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        value = self.func(instance)
+        if not isinstance(instance, Endpoint):
+            instance.__dict__[self.name] = value
+
+        return value
+
+
 class AddEndpoint:
     """
     This is the class for a class decorator.
@@ -446,17 +698,17 @@ class AddEndpoint:
             if isinstance(self.endpoint, str):
                 # "_lazy_class' lazy loads the class object which is identified by the given string name from the
                 # module IN WHICH THE DECORATION IS PERFORMED. This is important! it has to be in the same module
-                endpoint_class = self._lazy_class(self.endpoint, this.__module__)
-                return endpoint_class(this.url, this.config)
-            else:
-                return self.endpoint(this.url, this.config)
+                # The resolved class replaces the string, so that the lookup is only done for the first access.
+                self.endpoint = self._lazy_class(self.endpoint, this.__module__)
+
+            return self.endpoint(this.url, this.config)
 
         anonymous.__name__ = self.name
-        # Here we dynamically add the function which we have just defined above as a new method of the class which is
-        # being decorated. In fact, the function is added as a property! This means it can be accessed as if it was a
-        # attribute. It is important that is actually a function though because every call to this attribute
-        # is actually meant to return a new endpoint instance!
-        setattr(cls, self.name, property(anonymous))
+        # Here we dynamically add the function which we have just defined above as a new attribute of the class which
+        # is being decorated. It is wrapped in a descriptor, which works like a cached property: The endpoint instance
+        # is only created for the first access and then stored in the instance dict of the decorated object. This is
+        # possible because endpoint objects are never modified, chaining with "__call__" always works on a copy.
+        setattr(cls, self.name, CachedEndpoint(anonymous))
 
         return cls
 
@@ -469,6 +721,4 @@ class AddEndpoint:
         :param module:
         :return:
         """
-        members = inspect.getmembers(sys.modules[module])
-        members_dict = dict(members)
-        return members_dict[class_name]
+        return getattr(sys.modules[module], class_name)
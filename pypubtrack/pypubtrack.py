@@ -1,5 +1,5 @@
 """Main module."""
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, List
 
 from pypubtrack.config import Config
 from pypubtrack.endpoint import Endpoint, AddEndpoint
@@ -11,6 +11,8 @@ from pypubtrack.util import exclude_keys, get_config_path
 
 class AuthorsEndpoint(Endpoint):
 
+    __slots__ = ()
+
     def get_endpoint(self):
         return 'authors'
 
@@ -18,18 +20,52 @@ class AuthorsEndpoint(Endpoint):
 @AddEndpoint('author', AuthorsEndpoint)
 class PublicationsEndpoint(Endpoint):
 
+    __slots__ = ()
+
     def get_endpoint(self):
         return 'publications'
 
 
 class AuthoringsEndpoint(Endpoint):
 
+    __slots__ = ()
+
+    # Whether the server supports the "bulk" endpoint for authorings. This is None until the first bulk request was
+    # attempted. Afterwards it is known, so that servers without support do not get a failing request every time.
+    bulk_supported = None
+
     def get_endpoint(self):
         return 'authorings'
 
+    def bulk_post(self, items: List[dict]) -> List[Any]:
+        """
+        Inserts all the authorings in *items* with a single POST request to the "bulk" endpoint.
+
+        Older versions of the pubtrack app do not implement the bulk endpoint. In this case all the items are posted
+        concurrently as individual records instead.
+
+        :param items:
+        :return:
+        """
+        if AuthoringsEndpoint.bulk_supported is not False:
+            try:
+                response = self._request('post', {'url': self.url + 'bulk/', 'json': items})
+                AuthoringsEndpoint.bulk_supported = True
+                return response
+            except ConnectionError as error:
+                # 404 and 405 mean, that the endpoint does not exist. All other errors are actual problems with the
+                # data and are raised.
+                if getattr(error, 'status_code', None) not in (404, 405):
+                    raise
+                AuthoringsEndpoint.bulk_supported = False
+
+        return self.post_many(items)
+
 
 class MetaAuthorsEndpoint(Endpoint):
 
+    __slots__ = ()
+
     def get_endpoint(self):
         return 'meta-authors'
 
@@ -79,7 +115,9 @@ class Pubtrack:
             response = self.publication.post(base_publication)
             publication['uuid'] = response['uuid']
         except ConnectionError as err:
-            pass
+            # A 400 means, that the publication already exists. Other errors are actual problems with the server.
+            if getattr(err, 'status_code', None) != 400:
+                raise
 
         self._import_publication_authors(publication)
 
@@ -89,19 +127,19 @@ class Pubtrack:
     def _import_publication_authors(self, publication: Dict[str, Any]):
         authors = publication['authors']
         authors = self._import_authors(authors)
-        for author in authors:
-            # Attempt to post the authorings
-            data = {
+        # All the authorings of the publication are inserted with a single request, if the server supports it.
+        self.authoring.bulk_post([
+            {
                 'author': author['slug'],
                 'publication': publication['uuid']
             }
-            self.authoring.post(data)
+            for author in authors
+        ])
 
     def _import_authors(self, authors: Iterable[Dict[str, Any]]):
-        result = []
-        for author in authors:
-            # The actual author
-            response = self.author.post_or_get(author, scopus_id=author['scopus_id'])
-            result.append(response)
-
-        return result
+        # Each author needs its own "post_or_get" round trip to the server. Sending them concurrently means, that
+        # importing a publication with many authors takes roughly as long as a single one of these round trips.
+        return self.author.post_or_get_many([
+            (author, {'scopus_id': author['scopus_id']})
+            for author in authors
+        ])
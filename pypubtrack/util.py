@@ -1,26 +1,35 @@
 import os
 import shutil
 import datetime
+import functools
 
 from pathlib import Path
-from typing import Iterable, Dict, Any
+from typing import Iterable, Dict, Any, TYPE_CHECKING
 
 import click
-from jinja2 import Template
-from pybliometrics.scopus import AbstractRetrieval
+from jinja2 import Environment, FileSystemLoader
+
+# "pybliometrics" is only needed for the type annotation here. It is imported lazily by the commands which use it.
+if TYPE_CHECKING:
+    from pybliometrics.scopus import AbstractRetrieval
 
 
 PATH = Path(__file__).parent.absolute()
 TEMPLATE_PATH = os.path.join(PATH, 'templates')
 
+# A single jinja environment is used for all the templates of the project.
+TEMPLATE_ENVIRONMENT = Environment(loader=FileSystemLoader(TEMPLATE_PATH))
+
 
 # INSTALLATION UTILITIES
 # ======================
 
+@functools.lru_cache(maxsize=1)
 def get_home_path() -> str:
     return str(Path.home())
 
 
+@functools.lru_cache(maxsize=1)
 def get_installation_path() -> str:
     # TODO: I think I would need to change this for windows and MAC?
     home_path = get_home_path()
@@ -28,14 +37,17 @@ def get_installation_path() -> str:
     return os.path.join(home_path, '.pypubtrack')
 
 
+@functools.lru_cache(maxsize=1)
 def get_config_path() -> str:
     folder_path = get_installation_path()
     return os.path.join(folder_path, 'config.toml')
 
 
+@functools.lru_cache(maxsize=1)
 def check_installation() -> bool:
     installation_path = get_installation_path()
-    return os.path.exists(installation_path) and os.path.isdir(installation_path)
+    # "isdir" is False for paths, which do not exist, so a separate "exists" check is not necessary.
+    return os.path.isdir(installation_path)
 
 
 def init_installation() -> str:
@@ -53,6 +65,9 @@ def init_installation() -> str:
     version_path = os.path.join(folder_path, 'VERSION')
     shutil.copyfile(version_template_path, version_path)
 
+    # The result of "check_installation" is cached, so it has to be reset now that the installation exists.
+    check_installation.cache_clear()
+
     return folder_path
 
 
@@ -60,27 +75,39 @@ def init_installation() -> str:
 # ==============
 
 def exclude_keys(d: Dict[Any, Any], keys: Iterable[Any]) -> Dict[Any, Any]:
-    copy = d.copy()
-    for key in keys:
-        del copy[key]
-
-    return copy
+    # Building the new dict directly is cheaper than copying the whole dict and deleting the keys afterwards.
+    keys = keys if isinstance(keys, (set, frozenset)) else frozenset(keys)
+    return {key: value for key, value in d.items() if key not in keys}
 
 
 # OUTPUT UTILITIES
 # ================
 
+@functools.lru_cache(maxsize=32)
 def get_template(name: str):
-    template_path = os.path.join(TEMPLATE_PATH, name)
-    with open(template_path, mode='r+') as file:
-        return Template(file.read())
+    return TEMPLATE_ENVIRONMENT.get_template(name)
+
 
+# The ANSI escape sequence which resets all styles
+STYLE_RESET = '\x1b[0m'
 
-def out(verbose: bool, *args, **kwargs):
+
+@functools.lru_cache(maxsize=None)
+def get_style_prefix(**styles) -> str:
+    # "reset=False" returns only the ANSI escape sequences, which start the given styles.
+    return click.style('', reset=False, **styles)
+
+
+def out(verbose: bool, message: str, **styles):
+    # Using the cached style prefix instead of "click.secho" avoids assembling the same escape sequences again for
+    # every line of output. "click.echo" still removes them, if the output is not a terminal.
     if verbose:
-        click.secho(*args, **kwargs)
+        if styles:
+            message = get_style_prefix(**styles) + message + STYLE_RESET
+        click.echo(message)
 
 
+@functools.lru_cache(maxsize=1)
 def get_version() -> str:
     version_path = os.path.join(PATH, 'VERSION')
     with open(version_path, mode='r') as file:
@@ -100,7 +127,7 @@ def author_name_kitopen(first_name: str, last_name: str) -> str:
 
 class ScopusPublicationAdapter:
 
-    def __init__(self, abstract_retrieval: AbstractRetrieval):
+    def __init__(self, abstract_retrieval: 'AbstractRetrieval'):
         self.abstract_retrieval = abstract_retrieval
 
     def get_publication(self):
@@ -113,16 +140,21 @@ class ScopusPublicationAdapter:
         }
 
     def get_authors(self):
-        results = []
-        for author in self.abstract_retrieval.authors:
-            results.append({
+        return [
+            {
                 'first_name': author.given_name,
                 'last_name': author.surname,
                 'scopus_id': author.auid
-            })
-        return results
+            }
+            for author in self.abstract_retrieval.authors
+        ]
 
     def _convert_date(self, date: str):
+        # Scopus returns the dates in the format "YYYY-MM-DD", so usually only the time has to be appended. Only other
+        # formats are actually parsed.
+        if len(date) == 10 and date[4] == '-' and date[7] == '-':
+            return date + 'T00:00:00'
+
         date_time = datetime.datetime.strptime(date, '%Y-%m-%d')
         return date_time.strftime('%Y-%m-%dT%H:%M:%S')
 
@@ -0,0 +1,20 @@
+from unittest import TestCase
+
+from pypubtrack.config import Config
+from pypubtrack.authentication import TokenAuthentication
+
+
+class TestTokenAuthentication(TestCase):
+
+    def test_headers_added_to_kwargs(self):
+        config = Config()
+        authenticate = TokenAuthentication(config)
+        kwargs = authenticate({'url': 'http://test.com/api'})
+        self.assertEqual('TOKEN ' + config.get_token().strip(), kwargs['headers']['Authorization'])
+
+    def test_existing_headers_are_kept(self):
+        config = Config()
+        authenticate = TokenAuthentication(config)
+        kwargs = authenticate({'headers': {'Content-Type': 'application/json'}})
+        self.assertEqual('application/json', kwargs['headers']['Content-Type'])
+        self.assertEqual('TOKEN ' + config.get_token().strip(), kwargs['headers']['Authorization'])
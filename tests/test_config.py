@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest import TestCase, mock, skipIf
+
+from pypubtrack.config import Config, HttpxSession, PATH
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class TestConfigLoadFile(TestCase):
+
+    def setUp(self):
+        self.template_path = os.path.join(PATH, 'templates', 'config.toml')
+
+    def tearDown(self):
+        Config().load_file(self.template_path)
+
+    def test_modifications_do_not_leak_into_cache(self):
+        config = Config().load_file(self.template_path)
+        url = config.get_url()
+        config['basic']['url'] = 'http://modified.com/api'
+
+        config = Config().load_file(self.template_path)
+        self.assertEqual(url, config.get_url())
+
+    def test_changed_file_is_parsed_again(self):
+        with tempfile.TemporaryDirectory() as folder_path:
+            file_path = os.path.join(folder_path, 'config.toml')
+            with open(file_path, mode='w') as file:
+                file.write('[basic]\nurl = "http://first.com"\n')
+            self.assertEqual('http://first.com', Config().load_file(file_path).get_url())
+
+            with open(file_path, mode='w') as file:
+                file.write('[basic]\nurl = "http://second.com/api"\n')
+            self.assertEqual('http://second.com/api', Config().load_file(file_path).get_url())
+
+
+class TestConfigCache(TestCase):
+
+    def tearDown(self):
+        Config().load_file(os.path.join(PATH, 'templates', 'config.toml'))
+
+    def test_load_dict_clears_cache(self):
+        config = Config().load_dict({'basic': {'url': 'http://first.com'}})
+        self.assertEqual('http://first.com', config.get_url())
+
+        config.load_dict({'basic': {'url': 'http://second.com'}})
+        self.assertEqual('http://second.com', config.get_url())
+
+    def test_setitem_clears_cache(self):
+        config = Config().load_dict({'basic': {'url': 'http://first.com'}})
+        self.assertEqual('http://first.com', config.get_url())
+
+        config['basic'] = {'url': 'http://second.com'}
+        self.assertEqual('http://second.com', config.get_url())
+
+    def test_load_dict_replaces_session(self):
+        config = Config().load_dict({'basic': {'url': 'http://first.com', 'http_backend': 'requests'}})
+        session = config.get_session()
+
+        config.load_dict({'basic': {'url': 'http://first.com', 'http_backend': 'requests'}})
+        self.assertIsNot(session, config.get_session())
+
+
+@skipIf(httpx is None, 'httpx is not installed')
+class TestHttpxSession(TestCase):
+
+    def test_request_matches_requests_backend(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=b'{}')
+
+        session = HttpxSession(transport=httpx.MockTransport(handler))
+        response = session.request(
+            'post',
+            url='http://test.com/api/books/',
+            params={'title': 'first', 'author': None},
+            data=b'{"title": "first"}',
+            headers={'Content-Type': 'application/json'}
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(b'title=first', requests[0].url.query)
+        self.assertEqual(b'{"title": "first"}', requests[0].content)
+
+    def test_get_is_retried(self):
+        status_codes = [503, 503, 200]
+
+        def handler(request):
+            return httpx.Response(status_codes.pop(0))
+
+        session = HttpxSession(transport=httpx.MockTransport(handler))
+        with mock.patch('pypubtrack.config.time.sleep') as sleep:
+            response = session.request('get', url='http://test.com/api/books/')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, sleep.call_count)
@@ -1,4 +1,5 @@
-from unittest import TestCase
+import copy
+from unittest import TestCase, mock
 
 from pypubtrack.config import Config
 from pypubtrack.endpoint import Endpoint, AddEndpoint
@@ -22,12 +23,19 @@ class BooksEndpoint(Endpoint):
 
 @AddEndpoint('book', BooksEndpoint)
 @AddEndpoint('author', AuthorsEndpoint)
+@AddEndpoint('chapter', 'ChaptersEndpoint')
 class ChainingBase:
 
     url = 'http://test.com/api'
     config = Config()
 
 
+class ChaptersEndpoint(Endpoint):
+
+    def get_endpoint(self):
+        return 'chapters'
+
+
 class TestEndpointChaining(TestCase):
 
     def test_construction_books_endpoint(self):
@@ -50,3 +58,228 @@ class TestEndpointChaining(TestCase):
             'ENDPOINT http://test.com/api/books/title/authors',
             str(base.book('title').author)
         )
+
+    def test_lazy_endpoint_class(self):
+        base = ChainingBase()
+        self.assertIsInstance(base.chapter, ChaptersEndpoint)
+        self.assertEqual('ENDPOINT http://test.com/api/chapters', str(base.chapter))
+
+    def test_endpoint_chain_shares_session(self):
+        base = ChainingBase()
+        book = base.book('title')
+        self.assertIs(base.book.config.get_session(), book.author.config.get_session())
+
+    def test_deepcopy_shares_config(self):
+        base = ChainingBase()
+        books_endpoint = base.book
+        books_endpoint_copy = copy.deepcopy(books_endpoint)
+        self.assertIsNot(books_endpoint, books_endpoint_copy)
+        self.assertIs(books_endpoint.config, books_endpoint_copy.config)
+        self.assertEqual(str(books_endpoint), str(books_endpoint_copy))
+
+    def test_copy_keeps_subclass_slots(self):
+        class SlottedBooksEndpoint(BooksEndpoint):
+            __slots__ = ('extra',)
+
+        books_endpoint = SlottedBooksEndpoint(ChainingBase.url, Config())
+        books_endpoint.extra = 'value'
+
+        self.assertEqual('value', books_endpoint('1').extra)
+        self.assertEqual('value', copy.deepcopy(books_endpoint).extra)
+
+
+# TESTING URLS
+# ============
+
+class TestEndpointUrl(TestCase):
+
+    def test_get_url_without_primary_key(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        self.assertEqual('http://test.com/api/books/', books_endpoint._get_url())
+        self.assertEqual('http://test.com/api/books/', books_endpoint._get_url(''))
+
+    def test_get_url_with_primary_keys(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url + '/', Config())
+        self.assertEqual('http://test.com/api/books/title/', books_endpoint._get_url('title'))
+        self.assertEqual('http://test.com/api/books/title/2/', books_endpoint._get_url('title', '2'))
+        self.assertEqual('http://test.com/api/books/title/2/', books_endpoint._get_url('title', 2))
+
+
+# TESTING REQUESTS
+# ================
+
+class TestEndpointRequest(TestCase):
+
+    def request(self, status_code: int, content: bytes):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(Config, 'get_session') as get_session:
+            get_session.return_value.request.return_value.status_code = status_code
+            get_session.return_value.request.return_value.content = content
+            return books_endpoint._request('post', {'url': books_endpoint.url, 'json': {'title': 'first'}})
+
+    def test_successful_response_is_parsed(self):
+        self.assertEqual({'title': 'first'}, self.request(201, b'{"title": "first"}'))
+
+    def test_error_responses_are_raised(self):
+        for status_code in (400, 404, 500):
+            with self.assertRaises(ConnectionError) as context:
+                self.request(status_code, b'{"detail": "error"}')
+
+            self.assertEqual(status_code, context.exception.status_code)
+            self.assertEqual('http://test.com/api/books/', context.exception.kwargs['url'])
+
+
+# TESTING COMPOSITE OPERATIONS
+# ============================
+
+class TestEndpointIter(TestCase):
+
+    def test_iter_follows_next_pages(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        responses = [
+            {'next': 'http://test.com/api/books/?page=2', 'results': [{'title': 'first'}]},
+            {'next': None, 'results': [{'title': 'second'}]}
+        ]
+        with mock.patch.object(BooksEndpoint, '_request', side_effect=responses) as request:
+            titles = [book['title'] for book in books_endpoint.iter()]
+
+        self.assertEqual(['first', 'second'], titles)
+        self.assertEqual('http://test.com/api/books/?page=2', request.call_args[0][1]['url'])
+
+
+class TestEndpointGetBy(TestCase):
+
+    def test_get_by_requests_single_record(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        response = {'count': 1, 'next': None, 'results': [{'title': 'first'}]}
+        with mock.patch.object(BooksEndpoint, '_request', return_value=response) as request:
+            book = books_endpoint.get_by(title='first')
+
+        self.assertEqual('first', book['title'])
+        self.assertEqual({'title': 'first', 'page_size': 1}, request.call_args[0][1]['params'])
+
+    def test_get_by_not_found(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        response = {'count': 0, 'next': None, 'results': []}
+        with mock.patch.object(BooksEndpoint, '_request', return_value=response):
+            self.assertRaises(FileNotFoundError, books_endpoint.get_by, title='missing')
+
+
+class TestEndpointMany(TestCase):
+
+    def test_get_many_keeps_order(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(BooksEndpoint, '_request', side_effect=lambda method, kwargs: kwargs['url']):
+            urls = books_endpoint.get_many(['a', 'b', ('c', 'd')])
+
+        self.assertEqual([
+            'http://test.com/api/books/a/',
+            'http://test.com/api/books/b/',
+            'http://test.com/api/books/c/d/'
+        ], urls)
+
+    def test_post_many_keeps_order(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(BooksEndpoint, '_request', side_effect=lambda method, kwargs: kwargs['json']):
+            responses = books_endpoint.post_many([{'title': 'first'}, {'title': 'second'}])
+
+        self.assertEqual([{'title': 'first'}, {'title': 'second'}], responses)
+
+    def test_max_workers_defaults_to_config_concurrency(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(Config, 'get_concurrency', return_value=3):
+            self.assertEqual(3, books_endpoint._get_max_workers())
+
+
+class TestEndpointCaching(TestCase):
+
+    def test_endpoint_property_is_cached(self):
+        base = ChainingBase()
+        self.assertIs(base.book, base.book)
+
+    def test_chained_endpoint_property_is_not_cached(self):
+        base = ChainingBase()
+        self.assertEqual('ENDPOINT http://test.com/api/books/authors', str(base.book.author))
+        self.assertEqual('ENDPOINT http://test.com/api/books/title/authors', str(base.book('title').author))
+
+
+class TestEndpointResponseCache(TestCase):
+
+    def test_get_uses_cache_until_post(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(Config, 'get_cache_ttl', return_value=60), \
+                mock.patch.object(Config, 'get_session') as get_session:
+            get_session.return_value.request.return_value.status_code = 200
+            get_session.return_value.request.return_value.content = b'{"title": "first"}'
+
+            self.assertEqual({'title': 'first'}, books_endpoint.get('first'))
+            self.assertEqual({'title': 'first'}, books_endpoint.get('first'))
+            self.assertEqual(1, get_session.return_value.request.call_count)
+
+            books_endpoint.post({'title': 'second'})
+            books_endpoint.get('first')
+            self.assertEqual(3, get_session.return_value.request.call_count)
+
+    def test_unhashable_params_are_not_cached(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(Config, 'get_cache_ttl', return_value=60), \
+                mock.patch.object(BooksEndpoint, '_request', return_value={}) as request:
+            books_endpoint.get(params={'title': ['first', 'second']})
+            books_endpoint.get(params={'title': ['first', 'second']})
+
+        self.assertEqual(2, request.call_count)
+
+    def test_get_without_ttl_is_not_cached(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(BooksEndpoint, '_request', return_value={}) as request:
+            books_endpoint.get('first')
+            books_endpoint.get('first')
+
+        self.assertEqual(2, request.call_count)
+
+
+class TestEndpointPostOrGet(TestCase):
+
+    def test_existing_record_is_not_posted(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(BooksEndpoint, 'get_by', return_value={'title': 'first'}), \
+                mock.patch.object(BooksEndpoint, 'post') as post:
+            self.assertEqual({'title': 'first'}, books_endpoint.post_or_get({'title': 'first'}, title='first'))
+
+        post.assert_not_called()
+
+    def test_missing_record_is_posted(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        with mock.patch.object(BooksEndpoint, 'get_by', side_effect=FileNotFoundError()), \
+                mock.patch.object(BooksEndpoint, 'post', return_value={'title': 'first'}) as post:
+            self.assertEqual({'title': 'first'}, books_endpoint.post_or_get({'title': 'first'}, title='first'))
+
+        post.assert_called_once_with({'title': 'first'})
+
+    def test_empty_unique_properties_are_not_looked_up(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        for get in [{}, {'title': None}, {'title': ''}]:
+            with mock.patch.object(BooksEndpoint, 'get_by') as get_by, \
+                    mock.patch.object(BooksEndpoint, 'post', return_value={'title': 'first'}) as post:
+                self.assertEqual({'title': 'first'}, books_endpoint.post_or_get({'title': 'first'}, **get))
+
+            get_by.assert_not_called()
+            post.assert_called_once_with({'title': 'first'})
+
+    def test_server_error_on_post_is_raised(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        error = ConnectionError()
+        error.status_code = 500
+        with mock.patch.object(BooksEndpoint, 'get_by', side_effect=FileNotFoundError()), \
+                mock.patch.object(BooksEndpoint, 'post', side_effect=error):
+            self.assertRaises(ConnectionError, books_endpoint.post_or_get, {'title': 'first'}, title='first')
+
+    def test_rejected_post_without_unique_properties_is_raised(self):
+        books_endpoint = BooksEndpoint(ChainingBase.url, Config())
+        error = ConnectionError()
+        error.status_code = 400
+        with mock.patch.object(BooksEndpoint, 'get_by') as get_by, \
+                mock.patch.object(BooksEndpoint, 'post', side_effect=error):
+            self.assertRaises(ConnectionError, books_endpoint.post_or_get, {'title': 'first'}, title=None)
+
+        get_by.assert_not_called()
@@ -2,12 +2,16 @@
 
 """Tests for `pypubtrack` package."""
 
+import os
 import pytest
+from unittest import TestCase, mock
 
 from click.testing import CliRunner
 
 from pypubtrack import pypubtrack
 from pypubtrack import cli
+from pypubtrack.config import Config, PATH
+from pypubtrack.endpoint import Endpoint
 
 
 @pytest.fixture
@@ -29,3 +33,90 @@ def test_content(response):
 def test_command_line_interface():
     """Test the CLI."""
     runner = CliRunner()
+
+
+class TestAuthoringsBulkPost(TestCase):
+
+    def setUp(self):
+        pypubtrack.AuthoringsEndpoint.bulk_supported = None
+        self.endpoint = pypubtrack.AuthoringsEndpoint('http://test.com/api', Config())
+
+    def tearDown(self):
+        pypubtrack.AuthoringsEndpoint.bulk_supported = None
+
+    def test_bulk_post_single_request(self):
+        with mock.patch.object(pypubtrack.AuthoringsEndpoint, '_request', return_value=[]) as request:
+            self.endpoint.bulk_post([{'author': 'a'}, {'author': 'b'}])
+
+        self.assertEqual(1, request.call_count)
+        self.assertEqual('http://test.com/api/authorings/bulk/', request.call_args[0][1]['url'])
+
+    def test_bulk_post_falls_back_to_single_posts(self):
+        def request(method, kwargs):
+            if kwargs['url'].endswith('bulk/'):
+                error = ConnectionError()
+                error.status_code = 404
+                raise error
+            return kwargs['json']
+
+        items = [{'author': 'a'}, {'author': 'b'}]
+        with mock.patch.object(pypubtrack.AuthoringsEndpoint, '_request', side_effect=request):
+            self.assertEqual(items, self.endpoint.bulk_post(items))
+
+        self.assertIs(False, pypubtrack.AuthoringsEndpoint.bulk_supported)
+
+
+class TestUpdateKitopen(TestCase):
+
+    def request(self, method, kwargs):
+        self.requests.append((method, kwargs))
+        if kwargs['url'].endswith('/meta-authors/'):
+            return {'next': None, 'results': [
+                {'authors': [{'first_name': 'Jonas', 'last_name': 'Teufel'}]}
+            ]}
+        if method == 'get' and kwargs['url'].endswith('/publications/'):
+            return {'next': None, 'results': [
+                {'uuid': 'u1', 'doi': 'd1', 'kitopen_id': ''},
+                {'uuid': 'u2', 'doi': 'd2', 'kitopen_id': 'k2'},
+                {'uuid': 'u4', 'doi': 'd4', 'kitopen_id': ''}
+            ]}
+        return {}
+
+    def test_update_kitopen_patches_known_publications(self):
+        self.requests = []
+        records = [
+            {'doi': 'd1', 'id': 'k1', 'pof_structure': 'p1'},
+            {'doi': 'd2', 'id': 'k2', 'pof_structure': 'p2'},
+            # Not a publication of pubtrack
+            {'doi': 'd3', 'id': 'k3', 'pof_structure': 'p3'},
+            # Without a DOI the record is skipped entirely
+            {'doi': '', 'id': 'k5', 'pof_structure': 'p5'},
+            # A malformed record without POF structure
+            {'doi': 'd4', 'id': 'k4'}
+        ]
+        results = [mock.Mock(data=record) for record in records]
+
+        runner = CliRunner()
+        config_path = os.path.join(PATH, 'templates', 'config.toml')
+        with mock.patch('pykitopen.KitOpen') as kitopen, \
+                mock.patch.object(Endpoint, '_request', side_effect=self.request):
+            kitopen.return_value.search.return_value = results
+            result = runner.invoke(cli.cli, ['--config', config_path, 'update-kitopen'])
+
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn('Updated 2/4 publications', result.output)
+
+        patches = sorted(
+            (kwargs['url'], kwargs['json']) for method, kwargs in self.requests if method == 'patch'
+        )
+        self.assertEqual([
+            ('http://pubtrack.ignorelist.com/api/v1/publications/u1/',
+             {'on_kitopen': True, 'pof_structure': 'p1', 'kitopen_id': 'k1'}),
+            ('http://pubtrack.ignorelist.com/api/v1/publications/u2/',
+             {'on_kitopen': True, 'pof_structure': 'p2'})
+        ], patches)
+
+        publication_requests = [
+            kwargs for method, kwargs in self.requests if method == 'get' and kwargs['url'].endswith('/publications/')
+        ]
+        self.assertEqual(1000, publication_requests[0]['params']['page_size'])